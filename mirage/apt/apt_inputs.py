@@ -42,7 +42,6 @@ October 2018 - Major modifications to read programs of all science instruments a
 import copy
 import os
 import logging
-import re
 import argparse
 import pkg_resources
 import warnings
@@ -847,7 +846,7 @@ class AptInput:
                             obslabel = line[2:paren-1]
                             obslabel = obslabel.strip()
                         if (' (' in obslabel) and (')' in obslabel):
-                            obslabel = re.split(r' \(|\)', obslabel)[0]
+                            obslabel = read_apt_xml.LABEL_PARENTHESES.split(obslabel, maxsplit=1)[0]
 
                     skip = False
 
@@ -1105,15 +1104,25 @@ def get_filters(pointing_info):
         in the pointing dictionary.
     """
     instrument_list = set(pointing_info['Instrument'])
+
+    # Convert the columns to arrays once, rather than for each instrument
+    instruments = np.array(pointing_info['Instrument'])
+    short_filters_all = np.array(pointing_info['ShortFilter'])
+    long_filters_all = np.array(pointing_info['LongFilter'])
+    short_pupils_all = np.array(pointing_info['ShortPupil'])
+    long_pupils_all = np.array(pointing_info['LongPupil'])
+    filter_wheels_all = np.array(pointing_info['FilterWheel'])
+    pupil_wheels_all = np.array(pointing_info['PupilWheel'])
+
     filters = {}
     for inst in instrument_list:
-        good = np.where(np.array(pointing_info['Instrument']) == inst.upper())[0]
+        good = instruments == inst.upper()
         if inst.upper() == 'NIRCAM':
             filter_list = []
-            short_filters = np.array(pointing_info['ShortFilter'])[good]
-            long_filters = np.array(pointing_info['LongFilter'])[good]
-            short_pupils = np.array(pointing_info['ShortPupil'])[good]
-            long_pupils = np.array(pointing_info['LongPupil'])[good]
+            short_filters = short_filters_all[good]
+            long_filters = long_filters_all[good]
+            short_pupils = short_pupils_all[good]
+            long_pupils = long_pupils_all[good]
 
             for s_filt, s_pup, l_filt, l_pup in zip(short_filters, short_pupils, long_filters, long_pupils):
                 if s_pup not in NIRCAM_UNSUPPORTED_PUPIL_VALUES:
@@ -1127,8 +1136,8 @@ def get_filters(pointing_info):
             filter_list = ['guider1', 'guider2']
 
         else:
-            short_filters = np.array(pointing_info['FilterWheel'])[good]
-            short_pupils = np.array(pointing_info['PupilWheel'])[good]
+            short_filters = filter_wheels_all[good]
+            short_pupils = pupil_wheels_all[good]
 
             short_filter_only = np.where(((short_pupils == 'CLEAR') | (short_pupils == 'CLEARP')))[0]
             filter_list = list(set(short_pupils))
@@ -19,6 +19,13 @@ from ..utils.utils import append_dictionary
 APT_DIR = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 PACKAGE_DIR = os.path.dirname(APT_DIR)
 
+# Used to strip parenthetical comments, e.g. 'Obs label (comment)', from observation labels
+LABEL_PARENTHESES = re.compile(r' \(|\)')
+
+# Compiled once and reused to find all observations within the DataRequests element
+APT_NAMESPACES = {'apt': 'http://www.stsci.edu/JWST/APT'}
+OBSERVATION_XPATH = etree.XPath('.//apt:Observation', namespaces=APT_NAMESPACES)
+
 classpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
 log_config_file = os.path.join(classpath, 'logging', LOG_CONFIG_FILENAME)
 logging_functions.create_logger(log_config_file, STANDARD_LOGFILE_NAME)
@@ -208,22 +215,33 @@ class ReadAPTXML():
 
         # Find all observations (but use only those that use NIRCam or are WFSC)
         observation_data = tree.find(self.apt + 'DataRequests')
-        observation_list = observation_data.findall('.//' + self.apt + 'Observation')
+        observation_list = OBSERVATION_XPATH(observation_data)
 
         # Maintain a list of skipped observations, by number
         self.skipped_observations = []
         all_skipped = True
 
         # Loop through observations, get parameters
+        visit_tag = self.apt + 'Visit'
         for i_obs, obs in enumerate(observation_list):
-            observation_number = obs.find(self.apt + 'Number').text.zfill(3)
+            # Collect the top-level elements of the observation in a single pass,
+            # rather than searching the observation separately for each of them
+            obs_elements = {}
+            visit_numbers = []
+            for element in obs:
+                if element.tag == visit_tag:
+                    visit_numbers.append(int(element.items()[0][1]))
+                elif element.tag not in obs_elements:
+                    obs_elements[element.tag] = element
+
+            observation_number = obs_elements.get(self.apt + 'Number').text.zfill(3)
 
             # Create empty list that will be populated with a tuple of parameters
             # for every observation
             self.obs_tuple_list = []
 
             # Determine what template is used for the observation
-            template = obs.find(self.apt + 'Template')[0]
+            template = obs_elements.get(self.apt + 'Template')[0]
             template_name = etree.QName(template).localname
 
             # Are all the templates in the XML file something that we can handle?
@@ -247,16 +265,16 @@ class ReadAPTXML():
             all_skipped = False
 
             # Get observation label
-            label_ele = obs.find(self.apt + 'Label')
+            label_ele = obs_elements.get(self.apt + 'Label')
             if label_ele is not None:
                 label = label_ele.text
                 if (' (' in label) and (')' in label):
-                    label = re.split(r' \(|\)', label)[0]
+                    label = LABEL_PARENTHESES.split(label, maxsplit=1)[0]
             else:
                 label = 'None'
 
             # Get coordinated parallel
-            coordparallel = obs.find(self.apt + 'CoordinatedParallel').text
+            coordparallel = obs_elements.get(self.apt + 'CoordinatedParallel').text
 
             if verbose:
                 self.logger.info('+'*100)
@@ -271,31 +289,28 @@ class ReadAPTXML():
             CoordinatedParallelSet = None
             if coordparallel == 'true':
                 try:
-                    CoordinatedParallelSet = obs.find(self.apt + 'CoordinatedParallelSet').text
+                    CoordinatedParallelSet = obs_elements.get(self.apt + 'CoordinatedParallelSet').text
                 except AttributeError:
                     raise RuntimeError('Program does not specify parallels correctly.')
 
-            try:
-                obs_label = obs.find(self.apt + 'Label').text
-            except AttributeError:
+            if label_ele is not None:
+                obs_label = label_ele.text
+            else:
                 # label tag not present
                 obs_label = 'Observation 1'
 
             # Get target name
+            target_id = obs_elements.get(self.apt + 'TargetID').text
             try:
-                targ_name = obs.find(self.apt + 'TargetID').text.split(' ')[1]
+                targ_name = target_id.split(' ')[1]
             except IndexError as e:
                 self.logger.info("No target ID for observation: {}".format(obs))
-                targ_name = obs.find(self.apt + 'TargetID').text.split(' ')[0]
+                targ_name = target_id.split(' ')[0]
 
             # For NIRSpec Internal Lamp
             if targ_name == 'NONE':
                 self.target_info[targ_name] = ('0', '0')
 
-            # extract visit numbers
-            visit_numbers = [int(element.items()[0][1]) for element in obs if
-                             element.tag.split(self.apt)[1] == 'Visit']
-
             prop_params = [pi_name, prop_id, prop_title, prop_category,
                            science_category, coordparallel, observation_number, obs_label, targ_name]
 
@@ -317,7 +332,7 @@ class ReadAPTXML():
                                                                           proposal_parameter_dictionary,
                                                                           verbose=verbose)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['MiriImaging']:
                         pass
                     else:
@@ -330,7 +345,7 @@ class ReadAPTXML():
                 exposures_dictionary = self.read_niriss_external_calibration_template(template, template_name, obs,
                                                                                       proposal_parameter_dictionary)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['MiriImaging']:
                         pass
                     else:
@@ -343,7 +358,7 @@ class ReadAPTXML():
                 exposures_dictionary = self.read_miri_prime_imaging(template, template_name, obs,
                                                                     proposal_parameter_dictionary)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['NircamImaging', 'NirissWfss']:
                         parallel_exposures_dictionary = self.read_parallel_exposures(obs, exposures_dictionary,
                                                                                      proposal_parameter_dictionary,
@@ -359,7 +374,7 @@ class ReadAPTXML():
                 exposures_dictionary = self.read_nirspec_mos(template, template_name, obs,
                                                                     proposal_parameter_dictionary)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['NircamImaging']:
                         parallel_exposures_dictionary = self.read_parallel_exposures(obs, exposures_dictionary,
                                                                                      proposal_parameter_dictionary,
@@ -415,7 +430,7 @@ class ReadAPTXML():
                 exposures_dictionary = self.read_nircam_wfss_template(template, template_name, obs,
                                                                       proposal_parameter_dictionary)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['MiriImaging']:
                         pass
                     elif parallel_template_name in ['NirissImaging']:
@@ -434,7 +449,7 @@ class ReadAPTXML():
                                                                       proposal_parameter_dictionary,
                                                                       verbose=verbose)
                 if coordparallel == 'true':
-                    parallel_template_name = etree.QName(obs.find(self.apt + 'FirstCoordinatedTemplate')[0]).localname
+                    parallel_template_name = etree.QName(obs_elements.get(self.apt + 'FirstCoordinatedTemplate')[0]).localname
                     if parallel_template_name in ['MiriImaging']:
                         pass
                     elif parallel_template_name in ['NircamImaging']:
@@ -481,8 +496,8 @@ class ReadAPTXML():
             mosaic_tiles = obs.findall('.//' + self.apt + 'MosaicTiles')
 
             # count only tiles that are included
-            tile_state = np.array([mosaic_tiles[i].find('.//' + self.apt + 'TileState').text for i in range(len(mosaic_tiles))])
-            n_tiles = np.sum(np.array([True if state == 'Tile Included' else False for state in tile_state]))
+            tile_state = np.array([tile.find('.//' + self.apt + 'TileState').text for tile in mosaic_tiles], dtype=str)
+            n_tiles = np.count_nonzero(tile_state == 'Tile Included')
 
             label = obs_label
 
@@ -1020,7 +1035,6 @@ class ReadAPTXML():
         parallel_instrument = False
 
         if verbose:
-            print(f"Reading template {template_name}")
             self.logger.info(f"Reading {template_name} template")
 
         # Dictionary that holds the content of this observation only
@@ -2561,7 +2575,7 @@ class ReadAPTXML():
         instrument = 'NIRCam'
 
         if verbose:
-            print(f"Reading template {template_name}")
+            self.logger.info(f"Reading {template_name} template")
 
         # Dictionary that holds the content of this observation only
         exposures_dictionary = copy.deepcopy(self.empty_exposures_dictionary)
@@ -2842,16 +2856,19 @@ class ReadAPTXML():
         if ta_targ.upper() != 'NONE':
             for key in science_exposures:
                 exposures_dictionary[key] = list(ta_exposures[key])
-            print(f"Number of TA exposure specs: {len(ta_exposures[key])}")
+            if verbose:
+                self.logger.info(f"Number of TA exposure specs: {len(ta_exposures[key])}")
 
         if astrometric_confirmation_imaging.upper() == 'TRUE':
             for key in science_exposures:
                 exposures_dictionary[key] = list(exposures_dictionary[key]) + list(astrometric_exposures[key])
-            print(f"Number of astrometric exposure specs: {len(astrometric_exposures[key])}")
+            if verbose:
+                self.logger.info(f"Number of astrometric exposure specs: {len(astrometric_exposures[key])}")
 
         for key in science_exposures:
             exposures_dictionary[key] = list(exposures_dictionary[key]) + list(science_exposures[key])
-        print(f"Number of science exposure specs: {len(science_exposures[key])}")
+        if verbose:
+            self.logger.info(f"Number of science exposure specs: {len(science_exposures[key])}")
 
 
         self.logger.info('Number of dithers for NIRCam coron exposure: {} primary * {} subpixel = {}'.format(number_of_primary_dithers,
@@ -2910,7 +2927,6 @@ class ReadAPTXML():
         instrument = 'MIRI'
 
         if verbose:
-            print(f"Reading template {template_name}")
             self.logger.info(f"Reading {template_name} template")
 
         # Dictionary that holds the content of this observation only
@@ -3068,11 +3084,13 @@ class ReadAPTXML():
         if ta_targ.upper() != 'NONE' and include_MIRI_TAs:
             for key in science_exposures:
                 exposures_dictionary[key] = list(ta_exposures[key])
-            print(f"Number of TA exposure specs: {len(ta_exposures[key])}")
+            if verbose:
+                self.logger.info(f"Number of TA exposure specs: {len(ta_exposures[key])}")
 
         for key in science_exposures:
             exposures_dictionary[key] = list(exposures_dictionary[key]) + list(science_exposures[key])
-        print(f"Number of science exposure specs: {len(science_exposures[key])}")
+        if verbose:
+            self.logger.info(f"Number of science exposure specs: {len(science_exposures[key])}")
 
 
         self.logger.info('Number of dithers for MIRI coron exposure: {} primary * {} subpixel = {}'.format(number_of_primary_dithers,
@@ -4024,12 +4042,21 @@ def get_guider_number(xml_file, observation_number):
     apt_namespace = '{http://www.stsci.edu/JWST/APT}'
     fgs_namespace = '{http://www.stsci.edu/JWST/APT/Template/FgsExternalCalibration}'
 
-    with open(xml_file) as f:
-        tree = etree.parse(f)
+    # Stream through the file rather than building the full tree. Observation
+    # elements also appear outside of DataRequests (e.g. in LinkingRequirements),
+    # so only those inside DataRequests are considered.
+    data_requests_tag = apt_namespace + 'DataRequests'
+    in_data_requests = False
+    for event, obs in etree.iterparse(xml_file, events=('start', 'end'),
+                                      tag=(data_requests_tag, apt_namespace + 'Observation')):
+        if obs.tag == data_requests_tag:
+            if event == 'end':
+                break
+            in_data_requests = True
+            continue
+        if event != 'end' or not in_data_requests:
+            continue
 
-    observation_data = tree.find(apt_namespace + 'DataRequests')
-    observation_list = observation_data.findall('.//' + apt_namespace + 'Observation')
-    for obs in observation_list:
         if int(obs.findtext(apt_namespace + 'Number')) == observation_number:
             try:
                 detector = obs.findtext('.//' + fgs_namespace + 'Detector')
@@ -4039,6 +4066,11 @@ def get_guider_number(xml_file, observation_number):
                 number = get_guider_number_from_special_requirements(apt_namespace, obs)
                 return number
 
+        # Free the observations that have already been checked
+        obs.clear()
+        while obs.getprevious() is not None:
+            del obs.getparent()[0]
+
     raise RuntimeError('Could not find guider number in observation {} in {}'.format(observation_number, xml_file))
 
 
@@ -47,6 +47,41 @@ CAT_TYPE_MAPPING = {'point_source': 'PointsourceCatalog', 'galaxy': 'GalaxyCatal
 
 POSSIBLE_CATS = list(CAT_TYPE_MAPPING.keys())
 
+# Templates used to write each entry of the observation list. Catalog fields
+# use the keys of default_values in get_observation_dict
+ENTRY_TEMPLATE = ("  EntryNumber{entry_number}:\n"
+                  "    Instrument: {instrument}\n"
+                  "    Date: {date}\n"
+                  "    PAV3: {pav3}\n"
+                  "    DitherIndex: {dither_index}\n"
+                  "    CosmicRayLibrary: {cr_library}\n"
+                  "    CosmicRayScale: {cr_scale}\n")
+
+NIRCAM_CHANNEL_TEMPLATE = ("      {channel}:\n"
+                           "        Filter: {filter}\n"
+                           "        PointSourceCatalog: {PointsourceCatalog}\n"
+                           "        GalaxyCatalog: {GalaxyCatalog}\n"
+                           "        ExtendedCatalog: {ExtendedCatalog}\n"
+                           "        MovingTargetList: {MovingTargetList}\n"
+                           "        MovingTargetSersic: {MovingTargetSersic}\n"
+                           "        MovingTargetExtended: {MovingTargetExtended}\n"
+                           "        MovingTargetToTrack: {MovingTargetToTrack}\n"
+                           "        ImagingTSOCatalog: {ImagingTSOCatalog}\n"
+                           "        GrismTSOCatalog: {GrismTSOCatalog}\n"
+                           "        BackgroundRate: {background}\n")
+
+SINGLE_CHANNEL_TEMPLATE = ("    Filter: {filter}\n"
+                           "    PointSourceCatalog: {PointsourceCatalog}\n"
+                           "    GalaxyCatalog: {GalaxyCatalog}\n"
+                           "    ExtendedCatalog: {ExtendedCatalog}\n"
+                           "    MovingTargetList: {MovingTargetList}\n"
+                           "    MovingTargetSersic: {MovingTargetSersic}\n"
+                           "    MovingTargetExtended: {MovingTargetExtended}\n"
+                           "    MovingTargetToTrack: {MovingTargetToTrack}\n"
+                           "    ImagingTSOCatalog: {ImagingTSOCatalog}\n"
+                           "    GrismTSOCatalog: {GrismTSOCatalog}\n"
+                           "    BackgroundRate: {background}\n")
+
 
 def catalog_dictionary_per_observation(cats, obs_nums, targets, defaults):
     """Translate a dictionary of catalogs from a case of either:
@@ -501,17 +536,18 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
 
     xml_dict = readxml_obj.read_xml(xml_file, verbose=verbose)
 
-    # if verbose:
-    #print('Summary of observation dictionary:')
-    #for key in xml_dict.keys():
-    #    print('{:<25}: number of elements is {:>5}'.format(key, len(xml_dict[key])))
+    if verbose:
+        logger.info('Summary of observation dictionary:')
+        for key in xml_dict.keys():
+            logger.info('{:<25}: number of elements is {:>5}'.format(key, len(xml_dict[key])))
 
     # create an expanded dictionary that contains lists of parameters expanded for dithers
     xml_dict = expand_for_dithers(xml_dict, verbose=verbose)
 
-    #print('Summary of observation dictionary after expanding for dithers:')
-    #for key in xml_dict.keys():
-    #    print('{:<25}: number of elements is {:>5}'.format(key, len(xml_dict[key])))
+    if verbose:
+        logger.info('Summary of observation dictionary after expanding for dithers:')
+        for key in xml_dict.keys():
+            logger.info('{:<25}: number of elements is {:>5}'.format(key, len(xml_dict[key])))
     return_dict = None
 
     # array of unique instrument names
@@ -545,6 +581,12 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
     default_values['CosmicRayScale'] = 1.0
     default_parameter_name_list = ['MovingTargetConvolveExtended', 'ExtendedScale', 'ExtendedCenter']
 
+    # These parameters are the same for every entry, so render them only once
+    nircam_default_parameters = ''.join(["        {}: {}\n".format(key, default_values[key])
+                                         for key in default_parameter_name_list])
+    single_channel_default_parameters = ''.join(["    {}: {}\n".format(key, default_values[key])
+                                                 for key in default_parameter_name_list])
+
     # Cosmic rays
     # Can be:
     # cr = {'library': 'SUNMAX', 'scale': 1.0}
@@ -677,98 +719,92 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
         counter[inst] = 0
 
     entry_numbers = []
-    observation_numbers = list(dict.fromkeys(xml_dict['ObservationID']))
-
-    for observation_index, observation_number in enumerate(observation_numbers):
-        first_index = xml_dict['ObservationID'].index(observation_number)
+    default_catalog_values = {key: default_values[key] for key in CAT_TYPE_MAPPING.values()}
+
+    # Group the rows of the table by observation in a single pass. A stable sort
+    # keeps the rows within each observation in their original order.
+    observation_ids = np.array(xml_dict['ObservationID'])
+    sort_order = np.argsort(observation_ids, kind='stable')
+    unique_ids, group_starts = np.unique(observation_ids[sort_order], return_index=True)
+    group_ends = np.r_[group_starts[1:], len(observation_ids)]
+
+    # Observations are written in the order in which they appear in the xml file
+    group_order = np.argsort(sort_order[group_starts], kind='stable')
+    observation_numbers = unique_ids[group_order].tolist()
+
+    for observation_number, group_index in zip(observation_numbers, group_order):
+        observation_rows = sort_order[group_starts[group_index]:group_ends[group_index]]
+        first_index = observation_rows[0]
         text += [
             "Observation{}:\n".format(observation_number),
             "  Name: '{}'\n".format(xml_dict['ObservationName'][first_index])
             ]
-        observation_rows = np.where(np.array(xml_dict['ObservationID']) == observation_number)[0]
+
+        # Values that depend only on the observation number are looked up once
+        # per observation rather than for every row and dither
+
+        # Get the proper date value
+        if dates is None:
+            date_value = default_values['Date']
+        else:
+            try:
+                value = dates[observation_number]
+                if 'T' in value:
+                    date_value = dates[observation_number]
+                else:
+                    date_value = '{}T{}'.format(dates[observation_number], default_time)
+            except KeyError:
+                logger.error(("\n\nERROR: No date value specified for Observation {} in date dictionary. "
+                              "Quitting.\n\n".format(observation_number)))
+                raise KeyError
+
+        # Get the proper PAV3 value
+        if pav3 is None:
+            pav3_value = default_values['PAV3']
+        else:
+            try:
+                pav3_value = pav3[observation_number]
+            except KeyError:
+                logger.error(("\n\nERROR: No roll angle value specified for Observation {} in roll_angle "
+                              "dictionary. Quitting.\n\n".format(observation_number)))
+                raise KeyError
+
+        # Get the proper cosmic ray values
+        if cosmic_rays is None:
+            cr_library_value = default_values['CosmicRayLibrary']
+            cr_scale_value = default_values['CosmicRayScale']
+        else:
+            try:
+                cr_library_value = cosmic_rays[observation_number]['library']
+                cr_scale_value = cosmic_rays[observation_number]['scale']
+            except KeyError:
+                logger.error(("\n\nERROR: No cosmic ray library and/or scale value specified for "
+                              "Observation {} in cosmic_ray dictionary. Quitting.\n\n"
+                              .format(observation_number)))
+                raise KeyError
+
         for index in observation_rows:
             number_of_dithers = int(xml_dict['number_of_dithers'][index])
             instrument = xml_dict['Instrument'][index]
-            for dither_index in range(number_of_dithers):
 
-                # Get the proper date value
-                if dates is None:
-                    date_value = default_values['Date']
-                else:
-                    try:
-                        value = dates[observation_number]
-                        if 'T' in value:
-                            date_value = dates[observation_number]
-                        else:
-                            date_value = '{}T{}'.format(dates[observation_number], default_time)
-                    except KeyError:
-                        logger.error(("\n\nERROR: No date value specified for Observation {} in date dictionary. "
-                                      "Quitting.\n\n".format(observation_number)))
-                        raise KeyError
-
-                # Get the proper PAV3 value
-                if pav3 is None:
-                    pav3_value = default_values['PAV3']
-                else:
-                    try:
-                        pav3_value = pav3[observation_number]
-                    except KeyError:
-                        logger.error(("\n\nERROR: No roll angle value specified for Observation {} in roll_angle "
-                                      "dictionary. Quitting.\n\n".format(observation_number)))
-                        raise KeyError
-
-                # Get the proper catalog values
-                if catalogs_per_observation is None:
-                    ptsrc_catalog_value = default_values['PointsourceCatalog']
-                    galaxy_catalog_value = default_values['GalaxyCatalog']
-                    extended_catalog_value = default_values['ExtendedCatalog']
-                    mov_ptsrc_catalog_value = default_values['MovingTargetList']
-                    mov_sersic_catalog_value = default_values['MovingTargetSersic']
-                    mov_extended_catalog_value = default_values['MovingTargetExtended']
-                    mov_tracked_catalog_value = default_values['MovingTargetToTrack']
-                    im_tso_catalog_value = default_values['ImagingTSOCatalog']
-                    gr_tso_catalog_value = default_values['GrismTSOCatalog']
-                else:
-                    try:
-                        catalogs_to_use = catalogs_per_observation[observation_number][instrument.lower()]
-                    except KeyError:
-                        logger.error(("\n\nERROR: Missing observation number or instrument entry in catalog "
-                                      "dictionary. Failed to find catalogs[{}][{}]\n\n".format(observation_number,
-                                                                                               instrument.lower())))
-                        raise KeyError
-                    ptsrc_catalog_value = catalogs_to_use['PointsourceCatalog']
-                    galaxy_catalog_value = catalogs_to_use['GalaxyCatalog']
-                    extended_catalog_value = catalogs_to_use['ExtendedCatalog']
-                    mov_ptsrc_catalog_value = catalogs_to_use['MovingTargetList']
-                    mov_sersic_catalog_value = catalogs_to_use['MovingTargetSersic']
-                    mov_extended_catalog_value = catalogs_to_use['MovingTargetExtended']
-                    mov_tracked_catalog_value = catalogs_to_use['MovingTargetToTrack']
-                    im_tso_catalog_value = catalogs_to_use['ImagingTSOCatalog']
-                    gr_tso_catalog_value = catalogs_to_use['GrismTSOCatalog']
-
-                # Get the proper cosmic ray values
-                if cosmic_rays is None:
-                    cr_library_value = default_values['CosmicRayLibrary']
-                    cr_scale_value = default_values['CosmicRayScale']
-                else:
-                    try:
-                        cr_library_value = cosmic_rays[observation_number]['library']
-                        cr_scale_value = cosmic_rays[observation_number]['scale']
-                    except KeyError:
-                        logger.error(("\n\nERROR: No cosmic ray library and/or scale value specified for "
-                                      "Observation {} in cosmic_ray dictionary. Quitting.\n\n"
-                                      .format(observation_number)))
-                        raise KeyError
-
-                text += [
-                    "  EntryNumber{}:\n".format(entry_number),
-                    "    Instrument: {}\n".format(instrument),
-                    "    Date: {}\n".format(date_value),
-                    "    PAV3: {}\n".format(pav3_value),
-                    "    DitherIndex: {}\n".format(dither_index),
-                    "    CosmicRayLibrary: {}\n".format(cr_library_value),
-                    "    CosmicRayScale: {}\n".format(cr_scale_value),
-                ]
+            # Get the proper catalog values
+            if catalogs_per_observation is None:
+                catalog_values = default_catalog_values
+            else:
+                try:
+                    catalogs_to_use = catalogs_per_observation[observation_number][instrument.lower()]
+                except KeyError:
+                    logger.error(("\n\nERROR: Missing observation number or instrument entry in catalog "
+                                  "dictionary. Failed to find catalogs[{}][{}]\n\n".format(observation_number,
+                                                                                           instrument.lower())))
+                    raise KeyError
+                catalog_values = {key: catalogs_to_use[key] for key in CAT_TYPE_MAPPING.values()}
+
+            for dither_index in range(number_of_dithers):
+                text.append(ENTRY_TEMPLATE.format(entry_number=entry_number, instrument=instrument,
+                                                  date=date_value, pav3=pav3_value,
+                                                  dither_index=dither_index, cr_library=cr_library_value,
+                                                  cr_scale=cr_scale_value))
                 if return_dict is None:
                     return_dict = dictionary_slice(xml_dict, index)
                 else:
@@ -793,41 +829,14 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
 
                     text += [
                         "    FilterConfig:\n",
-                        "      SW:\n",
-                        "        Filter: {}\n".format(sw_filt),
-                        "        PointSourceCatalog: {}\n".format(ptsrc_catalog_value),
-                        "        GalaxyCatalog: {}\n".format(galaxy_catalog_value),
-                        "        ExtendedCatalog: {}\n".format(extended_catalog_value),
-                        "        MovingTargetList: {}\n".format(mov_ptsrc_catalog_value),
-                        "        MovingTargetSersic: {}\n".format(mov_sersic_catalog_value),
-                        "        MovingTargetExtended: {}\n".format(mov_extended_catalog_value),
-                        "        MovingTargetToTrack: {}\n".format(mov_tracked_catalog_value),
-                        "        ImagingTSOCatalog: {}\n".format(im_tso_catalog_value),
-                        "        GrismTSOCatalog: {}\n".format(gr_tso_catalog_value),
-                        "        BackgroundRate: {}\n".format(background_sw_value),
+                        NIRCAM_CHANNEL_TEMPLATE.format(channel='SW', filter=sw_filt, background=background_sw_value,
+                                                       **catalog_values),
+                        nircam_default_parameters,
+                        NIRCAM_CHANNEL_TEMPLATE.format(channel='LW', filter=lw_filt, background=background_lw_value,
+                                                       **catalog_values),
+                        nircam_default_parameters
                         ]
 
-                    for key in default_parameter_name_list:
-                        text += ["        {}: {}\n".format(key, default_values[key])]
-
-                    text += [
-                        "      LW:\n",
-                        "        Filter: {}\n".format(lw_filt),
-                        "        PointSourceCatalog: {}\n".format(ptsrc_catalog_value),
-                        "        GalaxyCatalog: {}\n".format(galaxy_catalog_value),
-                        "        ExtendedCatalog: {}\n".format(extended_catalog_value),
-                        "        MovingTargetList: {}\n".format(mov_ptsrc_catalog_value),
-                        "        MovingTargetSersic: {}\n".format(mov_sersic_catalog_value),
-                        "        MovingTargetExtended: {}\n".format(mov_extended_catalog_value),
-                        "        MovingTargetToTrack: {}\n".format(mov_tracked_catalog_value),
-                        "        ImagingTSOCatalog: {}\n".format(im_tso_catalog_value),
-                        "        GrismTSOCatalog: {}\n".format(gr_tso_catalog_value),
-                        "        BackgroundRate: {}\n".format(background_lw_value),
-                        ]
-
-                    for key in default_parameter_name_list:
-                        text += ["        {}: {}\n".format(key, default_values[key])]
-
                 elif instrument.lower() in ['niriss', 'fgs', 'nirspec', 'miri']:
                     if (instrument.lower() == 'niriss') and (xml_dict['APTTemplate'][index] in ['NirissExternalCalibration']):
                         filter_wheel_value = xml_dict['FilterWheel'][index]
@@ -855,22 +864,11 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
                             raise KeyError
 
                     text += [
-                        "    Filter: {}\n".format(filter_value),
-                        "    PointSourceCatalog: {}\n".format(ptsrc_catalog_value),
-                        "    GalaxyCatalog: {}\n".format(galaxy_catalog_value),
-                        "    ExtendedCatalog: {}\n".format(extended_catalog_value),
-                        "    MovingTargetList: {}\n".format(mov_ptsrc_catalog_value),
-                        "    MovingTargetSersic: {}\n".format(mov_sersic_catalog_value),
-                        "    MovingTargetExtended: {}\n".format(mov_extended_catalog_value),
-                        "    MovingTargetToTrack: {}\n".format(mov_tracked_catalog_value),
-                        "    ImagingTSOCatalog: {}\n".format(im_tso_catalog_value),
-                        "    GrismTSOCatalog: {}\n".format(gr_tso_catalog_value),
-                        "    BackgroundRate: {}\n".format(background_value),
+                        SINGLE_CHANNEL_TEMPLATE.format(filter=filter_value, background=background_value,
+                                                       **catalog_values),
+                        single_channel_default_parameters
                         ]
 
-                    for key in default_parameter_name_list:
-                        text += ["    {}: {}\n".format(key, default_values[key])]
-
                 entry_numbers.append(entry_number)
                 entry_number += 1
 
@@ -892,10 +890,8 @@ def get_observation_dict(xml_file, yaml_file, catalogs,
         else:
             logger.info("Successfully created the directory {} to hold the observation list file.".format(obs_dir))
 
-    f = open(yaml_file, 'w')
-    for line in text_out:
-        f.write(line)
-    f.close()
+    with open(yaml_file, 'w') as f:
+        f.writelines(text_out)
     logger.info('Wrote {} observations and {} entries to {}'.format(len(observation_numbers), entry_number, yaml_file))
 
     return return_dict, readxml_obj.skipped_observations